@@ -2,8 +2,16 @@
 This file generates all the data for plotting
 """
 import logging
+import multiprocessing
+import os
+import shlex
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from itertools import chain, repeat
 from pathlib import Path
 import tarfile
+from typing import Optional
 import docker
 import numpy as np
 import pandas as pd
@@ -12,15 +20,40 @@ from MDAnalysis.analysis import rms
 
 from helpers import create_folder, find_files_with_same_pattern
 
-logging.basicConfig(
-    format='[%(asctime)s] - %(levelname)s - %(filename)s - %(funcName)s:%(lineno)d - %(message)s',
-    level=logging.INFO
+logger = logging.getLogger(__name__)
+
+TAR_BUFSIZE = 1024 * 1024
+STDERR_TAIL_CHUNKS = 64
+MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
 )
 
+def _extract_xtc_from_tar(tar_path: Path, dest: str) -> list[str]:
+    """
+    Extracts the xtc files contained in a tar.gz archive.
+
+    Args:
+        tar_path (Path): The path of the tar.gz archive.
+        dest (str): The folder where the xtc files are extracted.
+
+    Returns:
+        list[str]: The names of the extracted xtc files.
+    """
+    xtc_files = []
+    with tarfile.open(tar_path, "r|gz", bufsize=TAR_BUFSIZE) as tar:
+        for member in tar:
+            if member.name.endswith(".xtc"):
+                tar.extract(member, path=dest)
+                xtc_files.append(member.name)
+
+    return xtc_files
+
 class GromacsData:
     CONTAINER_WORK_DIR = "/container/data"
     XTC_FILE = "final.xtc"
     XTC_NO_PBC_FILE = "fixed.xtc"
+    STEP_MARKER = "---MARK---"
+    GROMACS_IMAGE = "jpmontoya19/gromacs:latest"
 
     def __init__(self, path: str) -> None:
         self.path = path
@@ -34,37 +67,96 @@ class GromacsData:
         create_folder(self.path)
         self.results_folder = Path(f"{self.path}/results")
 
+        self._docker = docker.from_env()
+        self.container = self._docker.containers.run(
+            self.GROMACS_IMAGE,
+            "sleep infinity",
+            volumes=self.volume,
+            working_dir=self.CONTAINER_WORK_DIR,
+            detach=True,
+            auto_remove=True,
+            init=True
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stops the long-lived Gromacs container and closes the Docker client.
+        The container removes itself once stopped.
+        """
+        self.container.stop()
+        self._docker.close()
+
     def _run_gromacs_container(
         self,
         command,
         working_dir=CONTAINER_WORK_DIR,
+        stream=False,
         **kwargs
-    ) -> docker.models.containers.Container:
+    ) -> Optional[bytes]:
         """
-        Runs a Gromacs container with the specified command.
+        Runs the specified command inside the Gromacs container.
 
         Parameters:
             command (str): The command to be executed inside the container.
             working_dir (str, optional): The working directory inside the container. Defaults
                 to CONTAINER_WORK_DIR.
-            **kwargs: Additional keyword arguments to be passed to the container run method.
+            stream (bool, optional): Log stdout and stderr chunk by chunk as they arrive
+                instead of buffering them. Defaults to False.
+            **kwargs: Additional keyword arguments to be passed to the container exec_run method.
 
         Returns:
-            docker.models.containers.Container: The container object representing the
-                running Gromacs container.
+            bytes: The standard output of the command, or None when streaming.
+
+        Raises:
+            docker.errors.ContainerError: If the command exits with a non-zero status.
         """
-        gromacs_image = "jpmontoya19/gromacs:latest"
-        client = docker.from_env()
-        return client.containers.run(
-            gromacs_image,
-            command,
-            working_dir=working_dir,
-            **kwargs
-        )
+        if stream:
+            api = self._docker.api
+            exec_id = api.exec_create(
+                self.container.id,
+                command,
+                workdir=working_dir,
+                **kwargs
+            )['Id']
+            # gmx reports progress and errors on stderr; keep only its tail so
+            # a failure can be explained without buffering the whole output
+            stderr_tail = deque(maxlen=STDERR_TAIL_CHUNKS)
+            log_output = logger.isEnabledFor(logging.DEBUG)
+            for stdout_chunk, stderr_chunk in api.exec_start(exec_id, stream=True, demux=True):
+                if stderr_chunk:
+                    stderr_tail.append(stderr_chunk)
+                if not log_output:
+                    continue
+                for chunk in (stdout_chunk, stderr_chunk):
+                    if chunk:
+                        logger.debug(chunk.decode('utf-8', 'replace').rstrip())
+            exit_code = api.exec_inspect(exec_id)['ExitCode']
+            output, errors = None, b"".join(stderr_tail)
+        else:
+            exit_code, (output, errors) = self.container.exec_run(
+                command,
+                workdir=working_dir,
+                demux=True,
+                **kwargs
+            )
+            output = output or b""
+
+        if exit_code != 0:
+            raise docker.errors.ContainerError(
+                self.container, exit_code, command, self.GROMACS_IMAGE, errors
+            )
+        return output
     
-    def _find_last_tpr_file(self) -> Path:
+    @cached_property
+    def _last_tpr(self) -> tuple[str, Path]:
         """
-        Finds the last TPR file in the given path.
+        Finds the last TPR file in the given path, only once per instance.
 
         Returns:
             A tuple containing the name and path of the last TPR file.
@@ -72,79 +164,32 @@ class GromacsData:
         last_tpr = find_files_with_same_pattern(self.path, "md_0_*.tpr")[-1]
         return (last_tpr.name, last_tpr)
 
-    def generate_minimization_data(self) -> str:
-        """
-        Generate energy minimization data.
+    def generate_equilibration_data(self) -> dict:
         """
-        command = [
-            "sh",
-            "-c",
-            f"echo 10 0 | gmx energy -f em.edr -o {self.results_folder.name}/potential.xvg"
-        ]
+        Generate the minimization, NVT and NPT data in a single container run.
 
-        logging.info(command[-1])
-        energy_minimization = self._run_gromacs_container(
-            command,
-            volumes=self.volume
-        ).decode('utf-8')
-        return energy_minimization
-    
-    def generate_nvt_data(self):
-        """
-        Function to generate the temperature data
+        Returns:
+            dict: The output of each energy extraction keyed by step name.
         """
+        steps = {
+            "minimization": f"echo 10 0 | gmx energy -f em.edr -o {self.results_folder.name}/potential.xvg",
+            "temperature": f"echo 16 0 | gmx energy -f nvt.edr -o {self.results_folder.name}/temperature.xvg",
+            "pressure": f"echo 18 0 | gmx energy -f npt.edr -o {self.results_folder.name}/pressure.xvg",
+            "density": f"echo 24 0 | gmx energy -f npt.edr -o {self.results_folder.name}/density.xvg",
+        }
         command = [
             "sh",
             "-c",
-            f"""
-                echo 16 0 | \
-                gmx energy -f nvt.edr -o {self.results_folder.name}/temperature.xvg
-            """
-        ]
-
-        logging.info(command[-1])
-        temperature = self._run_gromacs_container(
-            command,
-            volumes=self.volume
-        ).decode("utf-8")
-        return temperature
-
-    def generate_npt_data(self):
-        """
-        Function to generate the pressure & density data
-        """
-        command_pressure = [
-            "sh",
-            "-c",
-            f"""
-                echo 18 0 | \
-                gmx energy -f npt.edr -o {self.results_folder.name}/pressure.xvg
-            """
+            f" && echo '{self.STEP_MARKER}' && ".join(steps.values())
         ]
 
-        logging.info(command_pressure[-1])
-        pressure = self._run_gromacs_container(
-            command_pressure,
-            volumes=self.volume
+        logger.info(command[-1])
+        output = self._run_gromacs_container(
+            command
         ).decode("utf-8")
 
-        command_density = [
-            "sh",
-            "-c",
-            f"""
-                echo 24 0 | \
-                gmx energy -f npt.edr -o {self.results_folder.name}/density.xvg
-            """
-        ]
-
-        logging.info(command_density[-1])
-        density = self._run_gromacs_container(
-            command_density,
-            volumes=self.volume
-        ).decode("utf-8")
+        return dict(zip(steps, output.split(f"{self.STEP_MARKER}\n")))
 
-        return f"{pressure}, \n, {density}"
-    
     def generate_final_xtc_file(self):
         """
         Generates the final xvg file joining all the parts of the trajectory
@@ -152,35 +197,34 @@ class GromacsData:
         steps = find_files_with_same_pattern(
             self.path, "my_job.output_*.tar.gz")
 
-        xtc_files = []
-        for step in steps:
-            with tarfile.open(step, "r:gz") as tar:
-                for member in tar.getmembers():
-                    if member.name.endswith(".xtc"):
-                        tar.extract(member, path=f"{self.path}")
-                        xtc_files.append(member.name)
+        # generate_gromacs_data calls this while other threads talk to the
+        # Docker daemon, so the workers must not be forked from this process
+        with ProcessPoolExecutor(
+            max_workers=min(len(steps), os.cpu_count() or 1) or 1,
+            mp_context=MP_CONTEXT
+        ) as executor:
+            xtc_files = list(chain.from_iterable(
+                executor.map(_extract_xtc_from_tar, steps, repeat(f"{self.path}"))
+            ))
 
         command = [
-            "sh",
-            "-c",
-            f"gmx trjcat -f {' '.join(xtc_files)} -o {self.results_folder.name}/{self.XTC_FILE}"
+            "gmx", "trjcat",
+            "-f", *xtc_files,
+            "-o", f"{self.results_folder.name}/{self.XTC_FILE}"
         ]
 
-        logging.info(command[-1])
-        _ = self._run_gromacs_container(
+        logger.info(shlex.join(command))
+        self._run_gromacs_container(
             command,
-            volumes=self.volume
+            stream=True
         )
     
-    def fix_periodicity(self):
+    def _fix_periodicity_command(self) -> str:
         """
-        Function to fix the periodicity of the trajectory.
+        Builds the shell command that fixes the periodicity of the trajectory.
         """
-        filename, _ = self._find_last_tpr_file()
-        command = [
-            "sh",
-            "-c",
-            f"""
+        filename, _ = self._last_tpr
+        return f"""
                 echo 1 0 | \
                 gmx trjconv \
                     -s {filename} \
@@ -188,21 +232,48 @@ class GromacsData:
                     -o {self.results_folder.name}/{self.XTC_NO_PBC_FILE} \
                     -pbc mol -center
             """
+
+    def _initial_configuration_command(self) -> str:
+        """
+        Builds the shell command that dumps the first frame of the fixed trajectory.
+        """
+        filename, _ = self._last_tpr
+        return f"""
+                echo 20 | \
+                gmx trjconv \
+                    -s {filename} \
+                    -f {self.results_folder.name}/{self.XTC_NO_PBC_FILE} \
+                    -n index.ndx \
+                    -o {self.results_folder.name}/initial_conf.pdb \
+                    -dump 0
+            """
+
+    def fix_periodicity_and_get_initial_configuration(self):
+        """
+        Fixes the periodicity of the trajectory and retrieves the initial configuration
+        of the system in a single container exec, while fixed.xtc is still in the page cache.
+
+        Returns:
+            None
+        """
+        command = [
+            "sh",
+            "-c",
+            f"{self._fix_periodicity_command().strip()} && "
+            f"{self._initial_configuration_command().strip()}"
         ]
 
-        logging.info(command[-1])
-        periodicity = self._run_gromacs_container(
+        logger.info(command[-1])
+        self._run_gromacs_container(
             command,
-            volumes=self.volume
-        ).decode("utf-8")
-
-        return periodicity
+            stream=True
+        )
     
     def generate_video(self):
         """
         Generate a video from the trajectory
         """
-        filename, _ = self._find_last_tpr_file()
+        filename, _ = self._last_tpr
         command = [
             "sh",
             "-c",
@@ -217,10 +288,10 @@ class GromacsData:
             """
         ]
 
-        logging.info(command[-1])
-        _ = self._run_gromacs_container(
+        logger.info(command[-1])
+        self._run_gromacs_container(
             command,
-            volumes=self.volume
+            stream=True
         )
 
     def get_initial_configuration(self):
@@ -230,52 +301,37 @@ class GromacsData:
         Returns:
             None
         """
-        filename, _ = self._find_last_tpr_file()
-
         command = [
             "sh",
             "-c",
-            f"""
-                echo 20 | \
-                gmx trjconv \
-                    -s {filename} \
-                    -f {self.results_folder.name}/{self.XTC_NO_PBC_FILE} \
-                    -n index.ndx \
-                    -o {self.results_folder.name}/initial_conf.pdb \
-                    -dump 0
-            """
+            self._initial_configuration_command()
         ]
 
-        logging.info(command[-1])
+        logger.info(command[-1])
 
-        _ = self._run_gromacs_container(
+        self._run_gromacs_container(
             command,
-            volumes=self.volume
+            stream=True
         )
 
     def generate_com_distance(self):
         """
         Generate the distance between the center of mass of the protein and the ligand
         """
-        filename, _ = self._find_last_tpr_file()
+        filename, _ = self._last_tpr
 
         command = [
-            "sh",
-            "-c",
-            f"""
-                gmx distance \
-                    -s {filename} \
-                    -f {self.results_folder.name}/{self.XTC_NO_PBC_FILE} \
-                    -oall {self.results_folder.name}/com_dist.xvg \
-                    -n index.ndx \
-                    -select 'com of group "UNL" plus com of group "Protein"'
-            """
+            "gmx", "distance",
+            "-s", filename,
+            "-f", f"{self.results_folder.name}/{self.XTC_NO_PBC_FILE}",
+            "-oall", f"{self.results_folder.name}/com_dist.xvg",
+            "-n", "index.ndx",
+            "-select", 'com of group "UNL" plus com of group "Protein"'
         ]
 
-        logging.info(command[-1])
+        logger.info(shlex.join(command))
         com = self._run_gromacs_container(
-            command,
-            volumes=self.volume
+            command
         ).decode("utf-8")
 
         return com
@@ -284,7 +340,7 @@ class GromacsData:
         """
         Solvent Accessible Surface Area (SASA)
         """
-        filename, _ = self._find_last_tpr_file()
+        filename, _ = self._last_tpr
 
         command = [
             "sh",
@@ -299,10 +355,9 @@ class GromacsData:
             """
         ]
 
-        logging.info(command[-1])
+        logger.info(command[-1])
         sasa = self._run_gromacs_container(
-            command,
-            volumes=self.volume
+            command
         ).decode("utf-8")
         return sasa
     
@@ -310,7 +365,7 @@ class GromacsData:
         """
         Generate the Interaction Energy
         """
-        filename, _ = self._find_last_tpr_file()
+        filename, _ = self._last_tpr
 
         command = [
             "sh",
@@ -323,10 +378,9 @@ class GromacsData:
             """
         ]
 
-        logging.info(command[-1])
+        logger.info(command[-1])
         coulombic_energy = self._run_gromacs_container(
-            command,
-            volumes=self.volume
+            command
         ).decode("utf-8")
 
         return coulombic_energy
@@ -345,8 +399,8 @@ class GromacsData:
         protein = u.select_atoms('protein')
         ligand = u.select_atoms('resname UNL')
 
-        logging.info(f"Total residues in the protein: {protein.residues.n_residues}")
-        logging.info(f"Total atoms in the ligand: {ligand.n_atoms}")
+        logger.info(f"Total residues in the protein: {protein.residues.n_residues}")
+        logger.info(f"Total atoms in the ligand: {ligand.n_atoms}")
 
         total_residues = protein.residues.n_residues
         selection = f"backbone and not (resid {total_residues-200} to {total_residues}) and not (resid 1 to 211)"
@@ -357,7 +411,7 @@ class GromacsData:
             ref_frame=0
         )
         rmsd_protein.run()
-        logging.info(f"RMSD Protein: {np.mean(rmsd_protein.rmsd[:, 2]):.2f} Å")
+        logger.info(f"RMSD Protein: {np.mean(rmsd_protein.rmsd[:, 2]):.2f} Å")
 
         rmsd_ligand = rms.RMSD(
             ligand,
@@ -366,7 +420,7 @@ class GromacsData:
             ref_frame=0
         )
         rmsd_ligand.run()
-        logging.info(f"RMSD Ligand: {np.mean(rmsd_ligand.rmsd[:, 2]):.2f} Å")
+        logger.info(f"RMSD Ligand: {np.mean(rmsd_ligand.rmsd[:, 2]):.2f} Å")
 
         df = pd.DataFrame({
             "Time (ps)": rmsd_protein.rmsd[:, 1],
@@ -385,7 +439,7 @@ class GromacsData:
         """
         Generate radius of gyration        
         """
-        filename, _ = self._find_last_tpr_file()
+        filename, _ = self._last_tpr
         command = [
             "sh",
             "-c",
@@ -398,10 +452,9 @@ class GromacsData:
             """
         ]
 
-        logging.info(command[-1])
+        logger.info(command[-1])
         gyr = self._run_gromacs_container(
-            command,
-            volumes=self.volume
+            command
         ).decode('utf-8')
 
         return gyr
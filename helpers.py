@@ -1,9 +1,18 @@
 """
 Helper functions
 """
+import os
+import re
+import tempfile
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from operator import attrgetter
 from pathlib import Path
 import numpy as np
 
+XVG_HEADER = re.compile(rb'(?:[#@][^\n]*\n)*')
+XVG_METADATA_LINES = re.compile(rb'^[#@].*$', re.MULTILINE)
+
 def create_folder(path: str, folder_name: str = "results") -> None:
     """
     Create a new folder at the specified path.
@@ -21,25 +30,104 @@ def create_folder(path: str, folder_name: str = "results") -> None:
     # Use the mkdir method to create the folder
     folder_path.mkdir(parents=True, exist_ok=True)
 
-def read_xvg_files(file_path: str):
+def _save_npy_cache(cache_path: Path, data_array: np.ndarray) -> None:
+    """
+    Atomically write the array to the .npy cache, so an interrupted run never
+    leaves a truncated cache behind. The cache is only an optimisation, so
+    failing to write it is not an error.
+    """
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix='.npy.tmp')
+    except OSError:
+        return
+
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, data_array)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+def _count_values_per_line(data: bytes) -> np.ndarray:
+    """
+    Count the whitespace separated values on every non-blank line of the data.
+    """
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    is_space = buffer <= ord(' ')
+
+    value_starts = np.flatnonzero(~is_space[1:] & is_space[:-1]) + 1
+    if buffer.size and not is_space[0]:
+        value_starts = np.concatenate(([0], value_starts))
+
+    lines = np.searchsorted(np.flatnonzero(buffer == ord('\n')), value_starts)
+    values_per_line = np.bincount(lines)
+    return values_per_line[values_per_line > 0]
+
+@lru_cache(maxsize=16)
+def read_xvg_files(file_path: str, usecols: tuple = None):
     """
     Read data from xvg files.
+
+    The parsed array is stored next to the xvg file as a .npy file and reused
+    while it is newer than the xvg. Arrays are also cached by path and
+    returned read-only, so callers must copy them before modifying.
+
+    Args:
+        file_path (str): The path of the xvg file.
+        usecols (tuple, optional): The columns to read. Defaults to all of them.
     """
-    data = []
+    xvg_path = Path(file_path)
+    if usecols is None:
+        cache_path = xvg_path.with_suffix('.npy')
+    else:
+        columns = '-'.join(str(column) for column in usecols)
+        cache_path = xvg_path.with_name(f"{xvg_path.stem}.cols{columns}.npy")
+
+    if cache_path.exists() and cache_path.stat().st_mtime >= xvg_path.stat().st_mtime:
+        return np.load(cache_path, mmap_mode='r')
 
-    with open(file_path, 'r', encoding='utf8') as file:
-        for line in file:
+    with open(xvg_path, 'rb') as file:
+        data = file.read()
 
-            if line.startswith('#') or line.startswith('@'):
-                continue
+    # gmx writes the metadata as a header, so only scan the whole body for
+    # metadata lines when some are left after skipping it
+    data = data[XVG_HEADER.match(data).end():]
+    if b'#' in data or b'@' in data:
+        data = XVG_METADATA_LINES.sub(b'', data)
 
-            values = [float(val) for val in line.strip().split()]
-            data.append(values)
+    # Parse every value in a single C-level scan, then restore the row shape
+    # once every data line is known to hold the same number of values
+    values_per_line = _count_values_per_line(data)
+    if values_per_line.size == 0:
+        # A header-only file, e.g. a gmx step that wrote no frames
+        data_array = np.empty((0, 0), dtype=np.float64)
+    else:
+        n_columns = int(values_per_line[0])
+        error = f"{file_path}: data lines do not all hold {n_columns} numeric values"
+        try:
+            data_array = np.fromstring(data, dtype=np.float64, sep=' ')
+        except ValueError as exc:
+            raise ValueError(error) from exc
+        if (
+            np.any(values_per_line != n_columns)
+            or data_array.size != values_per_line.size * n_columns
+        ):
+            raise ValueError(error)
+        data_array = data_array.reshape(-1, n_columns)
 
-    data_array = np.array(data, dtype=float)
+    if usecols is not None and data_array.size:
+        data_array = data_array[:, list(usecols)]
+    elif usecols is not None:
+        data_array = np.empty((0, len(usecols)), dtype=np.float64)
+    _save_npy_cache(cache_path, data_array)
+
+    data_array.setflags(write=False)
     return data_array
 
-def find_files_with_same_pattern(path: Path, pattern: str) -> list[str]:
+def find_files_with_same_pattern(path: Path, pattern: str) -> list[Path]:
     """
     Find files in the given path that match the specified pattern.
 
@@ -48,9 +136,11 @@ def find_files_with_same_pattern(path: Path, pattern: str) -> list[str]:
         pattern (str): The pattern to match against file names.
 
     Returns:
-        list[str]: A list of file paths that match the specified pattern.
+        list[Path]: A list of file paths sorted by name that match the specified pattern.
     """
-    search_directory = Path(path)
-    search_pattern = sorted(search_directory.glob(pattern))
+    with os.scandir(path) as entries:
+        matches = [entry for entry in entries if fnmatchcase(entry.name, pattern)]
+
+    matches.sort(key=attrgetter('name'))
 
-    return list(search_pattern)
+    return [Path(entry.path) for entry in matches]
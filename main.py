@@ -3,6 +3,9 @@ This is file contains orchestrates all the functions to generate Gromacs plots.
 """
 #!/usr/bin/env python3 -u
 import logging
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 import click
 
@@ -11,104 +14,127 @@ from plots import GromacsPlot
 
 logging.basicConfig(
     format='[%(asctime)s] - %(levelname)s - %(filename)s - %(funcName)s:%(lineno)d - %(message)s',
-    level=logging.DEBUG
+    level=logging.INFO
 )
+logger = logging.getLogger(__name__)
+
+def exit_on_sigterm(signum, frame):
+    """
+    Turn SIGTERM into SystemExit so the Gromacs container is cleaned up on the way out
+    """
+    sys.exit(128 + signum)
 
 class LigandPlots:
 
-    def __init__(self, path: Path, protein: str, ligand: str, run_gromacs: bool = False) -> None:
+    def __init__(
+        self,
+        path: Path,
+        protein: str,
+        ligand: str,
+        run_gromacs: bool = False,
+        dpi: int = 150,
+        image_format: str = "png"
+    ) -> None:
         self.path: Path = path
         self.protein: str = protein
         self.ligand: str = ligand
         self.run_gromacs: bool = run_gromacs
+        self.dpi: int = dpi
+        self.image_format: str = image_format
 
     def generate_gromacs_data(self):
-        gromacs: GromacsData = GromacsData(self.path)
-        
-        logging.info('Generating minimization data')
-        energy_minimization: str = gromacs.generate_minimization_data()
-        logging.info(energy_minimization)
-
-        logging.info('Generating NVT data')
-        temperature_data: str = gromacs.generate_nvt_data()
-        logging.info(temperature_data)
-
-        logging.info('Generating NPT data')
-        npt_data = gromacs.generate_npt_data()
-        logging.info(npt_data)
-
-        if self.run_gromacs:
-            logging.info('Generating final xtc file')
-            gromacs.generate_final_xtc_file()
-
-            periodicity = gromacs.fix_periodicity()
-            logging.info(periodicity)
-
-            gromacs.generate_video()
-
-        logging.info('Generate initial configuration file')
-        gromacs.get_initial_configuration()
-
-        logging.info('Calculate COM between ligand and protein')
-        com_dist = gromacs.generate_com_distance()
-        logging.info(com_dist)
-
-        logging.info('Generate Solvent Accessible Surface Area (SASA)')
-        sasa_ligand = gromacs.generate_sasa_ligand()
-        logging.info(sasa_ligand)
-
-        logging.info('Generate Coulombic Interaction Energy')
-        interaction_energy = gromacs.generate_interaction_energy()
-        logging.info(interaction_energy)
-
-        logging.info('Generate RMSD')
-        rmsd = gromacs.generate_rmsd()
-        logging.info(rmsd)
-
-        logging.info('Generate Radius of Gyration')
-        radius_of_gyration = gromacs.generate_radius_gyration()
-        logging.info(radius_of_gyration)
-
-        # logging.info('Generate RMSF')
+        with GromacsData(self.path) as gromacs, ThreadPoolExecutor(max_workers=4) as executor:
+            equilibration_step = 'Generating minimization, NVT and NPT data'
+            logger.info(equilibration_step)
+            futures = {executor.submit(gromacs.generate_equilibration_data): equilibration_step}
+
+            if self.run_gromacs:
+                logger.info('Generating final xtc file')
+                gromacs.generate_final_xtc_file()
+
+                logger.info('Fixing periodicity and generating initial configuration file')
+                gromacs.fix_periodicity_and_get_initial_configuration()
+
+            # Every remaining step only reads the fixed trajectory or the
+            # energy files, so they can run concurrently.
+            steps = {
+                'Calculate COM between ligand and protein': gromacs.generate_com_distance,
+                'Generate Solvent Accessible Surface Area (SASA)': gromacs.generate_sasa_ligand,
+                'Generate Coulombic Interaction Energy': gromacs.generate_interaction_energy,
+                'Generate RMSD': gromacs.generate_rmsd,
+                'Generate Radius of Gyration': gromacs.generate_radius_gyration,
+            }
+            if self.run_gromacs:
+                steps = {'Generate video': gromacs.generate_video, **steps}
+            else:
+                steps = {'Generate initial configuration file': gromacs.get_initial_configuration, **steps}
+
+            for step, function in steps.items():
+                futures[executor.submit(function)] = step
+
+            results = {}
+            for future in as_completed(futures):
+                step = futures[future]
+                try:
+                    results[step] = future.result()
+                except Exception:
+                    logger.error("%s failed", step)
+                    raise
+                logger.info("%s done", step)
+
+        for step, output in results[equilibration_step].items():
+            logger.debug("%s: %s", step, output)
+
+        for step in steps:
+            if results[step] is not None:
+                logger.debug("%s: %s", step, results[step])
+
+        # logger.info('Generate RMSF')
         # rmsf = gromacs.generate_rmsf()
-        # logging.info(rmsf)
+        # logger.debug(rmsf)
 
     def generate_gromacs_plots(self):
         """Generate plots from Gromacs data"""
-        plots: GromacsPlot = GromacsPlot(self.path, self.protein, self.ligand)
+        plots: GromacsPlot = GromacsPlot(
+            self.path,
+            self.protein,
+            self.ligand,
+            dpi=self.dpi,
+            image_format=self.image_format
+        )
         
-        logging.info('Generating energy minimization plot')
+        logger.info('Generating energy minimization plot')
         plots.plot_energy_minimization()
 
-        logging.info('Generating temperature plot')
+        logger.info('Generating temperature plot')
         plots.plot_temperature()
 
-        logging.info("Plotting pressure")
+        logger.info("Plotting pressure")
         plots.plot_pressure()
 
-        logging.info("Plotting density")
+        logger.info("Plotting density")
         plots.plot_density()
 
-        logging.info("Plotting COM distance")
+        logger.info("Plotting COM distance")
         plots.plot_com_distance()
 
-        logging.info("Plotting SASA")
+        logger.info("Plotting SASA")
         plots.plot_sasa_ligand()
 
-        logging.info("Plotting Interaction Energy")
+        logger.info("Plotting Interaction Energy")
         plots.plot_interaction_energy()
 
-        logging.info("Plotting RMSD")
+        logger.info("Plotting RMSD")
         plots.plot_rmsd()
 
-        logging.info("Plotting Radius of Gyration")
+        logger.info("Plotting Radius of Gyration")
         plots.plot_radius_gyration()
 
     def Run(self):
-        logging.info('Generating Gromacs data')
+        logger.info('Generating Gromacs data')
         self.generate_gromacs_data()
 
-        logging.info('Generating Gromacs plots')
+        logger.info('Generating Gromacs plots')
         self.generate_gromacs_plots()
 
 @click.command()
@@ -140,18 +166,38 @@ class LigandPlots:
     is_flag=True,
     help="Run gromacs commands"
 )
+@click.option(
+    '--dpi',
+    type=int,
+    default=150,
+    show_default=True,
+    help="Resolution of the raster images"
+)
+@click.option(
+    '--image_format',
+    type=click.Choice(['png', 'svg']),
+    default='png',
+    show_default=True,
+    help="Format of the generated images"
+)
 def cli(
     path: str,
     protein: str,
     ligand: str,
-    run_gromacs: bool = False
+    run_gromacs: bool = False,
+    dpi: int = 150,
+    image_format: str = "png"
 ):
-    logging.info(f"Running for protein {protein} and ligand {ligand}")
+    signal.signal(signal.SIGTERM, exit_on_sigterm)
+
+    logger.info(f"Running for protein {protein} and ligand {ligand}")
     ligand = LigandPlots(
         path=Path(path),
         protein=protein,
         ligand=ligand,
-        run_gromacs=run_gromacs
+        run_gromacs=run_gromacs,
+        dpi=dpi,
+        image_format=image_format
     )
     ligand.Run()
 
@@ -2,6 +2,8 @@
 This file contains the calls to graph the gromacs data
 """
 from pathlib import Path
+import matplotlib
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
@@ -13,14 +15,36 @@ class GromacsPlot:
     Class for plotting all the data
     """
 
-    def __init__(self, path: Path, protein: str, ligand: str):
+    def __init__(
+        self,
+        path: Path,
+        protein: str,
+        ligand: str,
+        dpi: int = 150,
+        image_format: str = "png"
+    ):
         self.path = path
         self.protein = protein
         self.ligand = ligand
+        self.dpi = dpi
+        self.image_format = image_format
         self.images_path = f"{self.path}/images/"
 
         create_folder(self.path, "images")
 
+    def save_figure(self, fig, name: str):
+        """
+        Save the figure in the images folder and release it
+        """
+        fig.savefig(
+            f"{self.images_path}{name}.{self.image_format}",
+            format=self.image_format,
+            bbox_inches='tight',
+            pad_inches=0.1,
+            dpi=self.dpi
+        )
+        plt.close(fig)
+
     def plot_data(self, x, y, titles):
         """
         Plot the specified data
@@ -30,19 +54,19 @@ class GromacsPlot:
         ax.plot(x, y, linewidth=0.75)
 
         # Add labels and title
-        plt.xlabel(titles[0])
-        plt.ylabel(titles[1])
-        plt.title(titles[2])
+        ax.set_xlabel(titles[0])
+        ax.set_ylabel(titles[1])
+        ax.set_title(titles[2])
 
         if len(titles) == 4:
-            plt.legend(titles[-1])
+            ax.legend(titles[-1])
 
-        plt.xlim(left=x[0], right=x[-1])
+        ax.set_xlim(left=x[0], right=x[-1])
 
-        plt.minorticks_on()
+        ax.minorticks_on()
 
-        plt.tick_params(axis='both', which='both',
-                        direction='in', right=True, top=True)
+        ax.tick_params(axis='both', which='both',
+                       direction='in', right=True, top=True)
 
         return fig, ax
     
@@ -50,9 +74,9 @@ class GromacsPlot:
         """
         Plot the energy minimization function
         """
-        energy_data = read_xvg_files(f"{self.path}/results/potential.xvg")
+        energy_data = read_xvg_files(f"{self.path}/results/potential.xvg", usecols=(0, 1))
 
-        _, ax = self.plot_data(
+        fig, ax = self.plot_data(
             energy_data[:, 0]/1000,
             energy_data[:, 1],
             [
@@ -64,22 +88,17 @@ class GromacsPlot:
 
         ax.lines[0].set_color('black')
 
-        plt.suptitle('Energy Minimization', fontsize=20, y=1)
+        fig.suptitle('Energy Minimization', fontsize=20, y=1)
 
-        plt.savefig(
-            self.images_path + "minimization.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "minimization")
 
     def plot_temperature(self):
         """
         Plot temperature in the NVT equilibration
         """
-        temperature = read_xvg_files(f"{self.path}/results/temperature.xvg")
+        temperature = read_xvg_files(f"{self.path}/results/temperature.xvg", usecols=(0, 1))
 
-        _, ax = self.plot_data(
+        fig, ax = self.plot_data(
             temperature[:, 0],
             temperature[:, 1],
             [
@@ -91,27 +110,22 @@ class GromacsPlot:
 
         ax.lines[0].set_color('black')
 
-        plt.ylim(
+        ax.set_ylim(
             temperature[:, 1].min() - 2,    
             temperature[:, 1].max() + 2
         )
 
-        plt.suptitle('Temperature', fontsize=20, y=1)
+        fig.suptitle('Temperature', fontsize=20, y=1)
 
-        plt.savefig(
-            self.images_path + "temperature.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "temperature")
 
     def plot_pressure(self):
         """
         Plot pressure in NPT equilibration
         """
-        pressure = read_xvg_files(f"{self.path}/results/pressure.xvg")
+        pressure = read_xvg_files(f"{self.path}/results/pressure.xvg", usecols=(0, 1))
 
-        _, ax = self.plot_data(
+        fig, ax = self.plot_data(
             pressure[:, 0],
             pressure[:, 1],
             [
@@ -123,27 +137,22 @@ class GromacsPlot:
 
         ax.lines[0].set_color('black')
 
-        plt.ylim(
+        ax.set_ylim(
             pressure[:, 1].min() - 60,    
             pressure[:, 1].max() + 60
         )
 
-        plt.suptitle('Pressure', fontsize=20, y=1)
+        fig.suptitle('Pressure', fontsize=20, y=1)
 
-        plt.savefig(
-            self.images_path + "pressure.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "pressure")
 
     def plot_density(self):
         """
         Plot density in NPT equilibration
         """
-        density = read_xvg_files(f"{self.path}/results/density.xvg")
+        density = read_xvg_files(f"{self.path}/results/density.xvg", usecols=(0, 1))
 
-        _, ax = self.plot_data(
+        fig, ax = self.plot_data(
             density[:, 0],
             density[:, 1],
             [
@@ -155,27 +164,22 @@ class GromacsPlot:
 
         ax.lines[0].set_color('black')
 
-        plt.ylim(
+        ax.set_ylim(
             density[:, 1].min() - 10,    
             density[:, 1].max() + 10
         )
 
-        plt.suptitle('Density', fontsize=20, y=1)
+        fig.suptitle('Density', fontsize=20, y=1)
 
-        plt.savefig(
-            self.images_path + "density.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "density")
 
     def plot_com_distance(self):
         """
         Plot the center of mass distance between the protein and the ligand
         """
-        com = read_xvg_files(f"{self.path}/results/com_dist.xvg")
+        com = read_xvg_files(f"{self.path}/results/com_dist.xvg", usecols=(0, 1))
 
-        _, ax = self.plot_data(
+        fig, ax = self.plot_data(
             com[:, 0]/1000,
             com[:, 1],
             [
@@ -187,27 +191,22 @@ class GromacsPlot:
 
         ax.lines[0].set_color('black')
 
-        plt.ylim(
+        ax.set_ylim(
             com[:, 1].min() - 0.5,    
             com[:, 1].max() + 0.5
         )
 
-        plt.suptitle('Distance between Centers of Mass', fontsize=20, y=1)
+        fig.suptitle('Distance between Centers of Mass', fontsize=20, y=1)
 
-        plt.savefig(
-            self.images_path + "com.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "com")
 
     def plot_sasa_ligand(self):
         """
         Plot the Solvent Accessible Surface Area of the ligand
         """
-        sasa = read_xvg_files(f"{self.path}/results/sasa.xvg")
+        sasa = read_xvg_files(f"{self.path}/results/sasa.xvg", usecols=(0, 1))
 
-        _, ax = self.plot_data(
+        fig, ax = self.plot_data(
             sasa[:, 0]/1000,
             sasa[:, 1],
             [
@@ -219,29 +218,24 @@ class GromacsPlot:
 
         ax.lines[0].set_color('black')
 
-        plt.ylim(
+        ax.set_ylim(
             sasa[:, 1].min() - 0.5,    
             sasa[:, 1].max() + 0.5
         )
 
-        plt.suptitle('Solvent Accessible Surface Area', fontsize=20, y=1)
+        fig.suptitle('Solvent Accessible Surface Area', fontsize=20, y=1)
 
-        plt.savefig(
-            self.images_path + "sasa.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "sasa")
 
     def plot_interaction_energy(self):
         """
         Plot the interaction energy
         """
-        energy = np.loadtxt(f"{self.path}/results/interaction_energy.xvg", comments=['#', '@'])
+        energy = read_xvg_files(f"{self.path}/results/interaction_energy.xvg", usecols=(0, 1, 2))
 
         total_energy = energy[:, 1] + energy[:, 2]
 
-        _ = self.plot_data(
+        fig, ax = self.plot_data(
             energy[:, 0]/1000,
             list(zip(energy[:, 1], energy[:, 2], total_energy)),
             [
@@ -251,7 +245,7 @@ class GromacsPlot:
             ]
         )
 
-        plt.legend(
+        ax.legend(
             ['Coulombic', 'LJ', 'Total'],
             fancybox=True,
             fontsize='small'
@@ -261,19 +255,14 @@ class GromacsPlot:
         lj_min, lj_max = np.min(energy[:, 2]), np.max(energy[:, 2])
         total_min, total_max = np.min(total_energy), np.max(total_energy)
 
-        plt.ylim(
+        ax.set_ylim(
             min(col_min, lj_min, total_min) - 25,    
             max(col_max, lj_max, total_max) + 25
         )
 
-        plt.suptitle('Interaction energy', fontsize=20, y=1)
+        fig.suptitle('Interaction energy', fontsize=20, y=1)
 
-        plt.savefig(
-            self.images_path + "inter_energy.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "inter_energy")
 
 
     def plot_rmsd(self):
@@ -282,7 +271,7 @@ class GromacsPlot:
         """
         rmsd = pd.read_csv(f"{self.path}/results/rmsd.csv")
 
-        _ = self.plot_data(
+        fig, ax = self.plot_data(
             rmsd['Time (ps)'].values/1000,
             list(zip(
                 rmsd['RMSD Protein (Å)'].values/10,
@@ -295,7 +284,7 @@ class GromacsPlot:
             ]
         )
 
-        plt.legend(
+        ax.legend(
             [
                 self.protein,
                 self.ligand
@@ -304,26 +293,21 @@ class GromacsPlot:
             fontsize='small'
         )
 
-        plt.ylim(0, (rmsd['RMSD Protein (Å)'].max()+2)/10)
+        ax.set_ylim(0, (rmsd['RMSD Protein (Å)'].max()+2)/10)
 
-        plt.suptitle('RMSD', fontsize=20, y=1)
+        fig.suptitle('RMSD', fontsize=20, y=1)
         
-        plt.tight_layout()
+        fig.tight_layout()
     
-        plt.savefig(
-            self.images_path + "rmsd.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "rmsd")
 
     def plot_radius_gyration(self):
         """
         Plot radius of gyration
         """
-        gyr = read_xvg_files(f"{self.path}/results/gyrate.xvg")
+        gyr = read_xvg_files(f"{self.path}/results/gyrate.xvg", usecols=(0, 1))
 
-        _, ax = self.plot_data(
+        fig, ax = self.plot_data(
             gyr[:, 0]/1000,
             gyr[:, 1],
             [
@@ -335,16 +319,11 @@ class GromacsPlot:
 
         ax.lines[0].set_color('black')
 
-        plt.ylim(
+        ax.set_ylim(
             min(gyr[:, 1]) - 0.2,
             max(gyr[:, 1]) + 0.2
         )
 
-        plt.suptitle('Radius of gyration', fontsize=20, y=1)
+        fig.suptitle('Radius of gyration', fontsize=20, y=1)
 
-        plt.savefig(
-            self.images_path + "gyration.png",
-            bbox_inches='tight',
-            pad_inches=0.1,
-            dpi=300
-        )
+        self.save_figure(fig, "gyration")